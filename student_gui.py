@@ -0,0 +1,1337 @@
+"""Tk interface for the Student Manager, built on StudentCore"""
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog, filedialog
+from itertools import islice
+import csv
+import os
+import queue
+import sqlite3
+import struct
+import threading
+import time
+
+from student_core import (
+    BINARY_EXTENSION, DATA_FILE, DATABASE_EXTENSIONS, DEFAULT_SCHEME, LOAD_CHUNK_SIZE, LOAD_POLL_MS,
+    REPORT_TITLE, VIEW_ALL_TEXT_LIMIT, WATCH_INTERVAL_MS, BackgroundWriter, BinaryMarksFile,
+    GradingScheme, OperationTimer, QueryError, SQLiteBackend, StudentCore, format_snapshot_diff,
+    format_student_report, grade_tag, student_row_values, validate_student, write_binary_marks
+)
+
+
+class VirtualTable(ttk.Frame):
+    """Treeview that only creates items for the rows currently on screen
+    
+    The rows can be any sequence of students. Scrolling moves a window over
+    the sequence and re-fills the visible items, so the cost of showing the
+    table does not depend on how many rows there are.
+    """
+    COLUMNS = (('name', 'Name', 180), ('code', 'Code', 70), ('coursework', 'Coursework', 90),
+               ('exam', 'Exam', 60), ('percentage', 'Percentage', 90), ('grade', 'Grade', 60))
+    ROW_HEIGHT = 20
+    
+    def __init__(self, parent, on_open=None, row_format=student_row_values, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.rows = []
+        self.row_format = self.default_format = row_format
+        self.top = 0
+        self.visible = 20
+        self.on_open = on_open
+        
+        ttk.Style().configure('Students.Treeview', rowheight=self.ROW_HEIGHT)
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in self.COLUMNS], show='headings',
+                                 style='Students.Treeview', selectmode='browse')
+        for column, heading, width in self.COLUMNS:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, anchor='w')
+        
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.tree.pack(side='left', fill='both', expand=True, padx=(0, 5))
+        self.scrollbar.pack(side='right', fill='y')
+        
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll(-1 if e.delta > 0 else 1, 'units'))
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-1, 'units'))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(1, 'units'))
+        self.tree.bind('<Prior>', lambda e: self.scroll(-1, 'pages'))
+        self.tree.bind('<Next>', lambda e: self.scroll(1, 'pages'))
+        self.tree.bind('<Double-1>', self.on_double_click)
+    
+    def tag_configure(self, tag, **options):
+        """Configure a tag used to colour rows"""
+        self.tree.tag_configure(tag, **options)
+    
+    def set_rows(self, rows, row_format=None):
+        """Show a new sequence of students, starting at the top"""
+        self.rows = rows
+        self.row_format = row_format or self.default_format
+        self.top = 0
+        self.render()
+    
+    def render(self):
+        """Fill the tree with the rows inside the visible window"""
+        total = len(self.rows)
+        self.top = max(0, min(self.top, total - self.visible))
+        items = self.tree.get_children()
+        if items:
+            self.tree.delete(*items)
+        
+        end = min(total, self.top + self.visible + 1)
+        for index in range(self.top, end):
+            values, tag = self.row_format(self.rows[index])[:2]
+            self.tree.insert('', tk.END, iid=str(index), values=values, tags=(tag,))
+        
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible) / total))
+        else:
+            self.scrollbar.set(0, 1)
+    
+    def on_resize(self, event):
+        """Recalculate how many rows fit when the widget changes size"""
+        visible = max(1, event.height // self.ROW_HEIGHT - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+    
+    def yview(self, action, amount, unit=None):
+        """Scrollbar callback mapping the scroll position onto the row window"""
+        if action == 'moveto':
+            self.top = int(float(amount) * len(self.rows))
+            self.render()
+        else:
+            self.scroll(int(amount), unit)
+    
+    def scroll(self, amount, unit):
+        """Move the visible window by rows or pages"""
+        step = self.visible if unit == 'pages' else 3
+        self.top += amount * step
+        self.render()
+        return 'break'
+    
+    def on_double_click(self, event):
+        """Open the student under the mouse pointer"""
+        item = self.tree.identify_row(event.y)
+        if item and self.on_open:
+            self.on_open(self.rows[int(item)])
+
+
+class StudentManager(StudentCore):
+    # Button handlers, and the core operations they run, timed when timings are on
+    TIMED_OPERATIONS = ['view_all_students', 'view_individual_student', 'find_student_by_code',
+                        'show_highest_student', 'show_lowest_student', 'sort_students',
+                        'add_student', 'delete_student', 'update_student', 'load_data',
+                        'apply_sort', 'insert_student', 'remove_student', 'student_changed',
+                        'save_changes', 'display_students', 'query_students']
+    
+    def __init__(self, root, data_file=DATA_FILE, column_store=False, journal_mode=True, timings=False):
+        self.root = root
+        self.root.title("Student Manager")
+        self.root.geometry("900x700")
+        self.root.configure(bg='#9F9F9F')  # Light gray background
+        
+        # BSU Color Scheme
+        self.colors = {
+            'primary': '#22263d',    # Dark blue
+            'secondary': '#35384d',  # Medium blue
+            'accent': '#797c8a',     # Light gray-blue
+            'light': '#9F9F9F',      # Light gray
+            'text_light': "#000000", # White text
+            'text_dark': '#22263d',  # Dark text
+            'success': '#4CAF50',    # Green for success
+            'warning': '#FF9800',    # Orange for warnings
+            'error': '#F44336'       # Red for errors
+        }
+        
+        # Configure ttk styles
+        self.configure_styles()
+        
+        # Binary marks file being browsed, if any
+        self.binary_file = None
+        
+        # Saves are written on a background thread so the window stays responsive
+        self.writer = BackgroundWriter()
+        
+        # Writes that lost a race with another instance, waiting to be merged
+        self.stale_jobs = []
+        
+        # Wrap the handlers before the buttons are created so they call the timed versions
+        self.timer = None
+        if timings:
+            self.timer = OperationTimer(lambda: len(getattr(self, 'students', ())), self.show_timing)
+            self.timer.instrument(self, self.TIMED_OPERATIONS)
+        
+        # Show the window straight away and load the students behind it
+        StudentCore.__init__(self, data_file, column_store=column_store, journal_mode=journal_mode,
+                             defer_load=True)
+        
+        # Create GUI
+        self.create_gui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.start_loading()
+        self.root.after(100, self.check_writer)
+        self.root.after(WATCH_INTERVAL_MS, self.watch_data_file)
+    
+    def configure_styles(self):
+        """Configure ttk styles with BSU colors"""
+        style = ttk.Style()
+        
+        # Configure main styles
+        style.configure('Primary.TFrame', background=self.colors['primary'])
+        style.configure('Secondary.TFrame', background=self.colors['secondary'])
+        style.configure('Light.TFrame', background=self.colors['light'])
+        
+        # Configure buttons
+        style.configure('Primary.TButton', 
+                       background=self.colors['primary'],
+                       foreground=self.colors['text_light'],
+                       borderwidth=0,
+                       focuscolor='none')
+        style.map('Primary.TButton',
+                 background=[('active', self.colors['secondary']),
+                           ('pressed', self.colors['accent'])])
+        
+        style.configure('Secondary.TButton',
+                       background=self.colors['secondary'],
+                       foreground=self.colors['text_light'],
+                       borderwidth=0)
+        style.map('Secondary.TButton',
+                 background=[('active', self.colors['accent']),
+                           ('pressed', self.colors['primary'])])
+        
+        # Configure labels
+        style.configure('Title.TLabel',
+                       background=self.colors['primary'],
+                       foreground=self.colors['text_light'],
+                       font=('Arial', 18, 'bold'))
+        
+        style.configure('Heading.TLabel',
+                       background=self.colors['secondary'],
+                       foreground=self.colors['text_light'],
+                       font=('Arial', 12, 'bold'))
+        
+        style.configure('Normal.TLabel',
+                       background=self.colors['light'],
+                       foreground=self.colors['text_dark'],
+                       font=('Arial', 10))
+    
+    def report_error(self, message):
+        """Show an error message box"""
+        messagebox.showerror("Error", message)
+    
+    def report_warning(self, message):
+        """Show a warning message box"""
+        messagebox.showwarning("Warning", message)
+    
+    def on_close(self):
+        """Compact the journal and finish every queued save before closing"""
+        if self.journal_entries and not self.loading:
+            self.compact_journal()
+        self.save_status_var.set("💾 Saving...")
+        self.root.update_idletasks()
+        self.writer.stop()
+        
+        # Writes that lost a race with another instance are merged and written directly
+        stale, self.stale_jobs = self.stale_jobs, []
+        results = []
+        while not self.writer.results.empty():
+            _, error, stale_jobs = self.writer.results.get()
+            stale += stale_jobs
+            results.append(error)
+        if stale:
+            writer, self.writer = self.writer, None
+            self.resolve_stale_writes(stale)
+            self.writer = writer
+        
+        # Make sure a failed final save is not closed over silently
+        for error in results:
+            if error and not messagebox.askyesno(
+                    "Error", f"Error saving data: {error}\n\nClose anyway?"):
+                self.writer = BackgroundWriter()
+                self.root.after(100, self.check_writer)
+                return
+        self.root.destroy()
+    
+    def save(self, job):
+        """Queue a save job and show it in the status bar"""
+        self.save_status_var.set("💾 Saving...")
+        return super().save(job)
+    
+    # Buttons that only read the students, so they can be used while loading
+    LOADING_COMMANDS = ['view_all_students', 'view_individual_student', 'find_student_by_code',
+                        'show_highest_student', 'show_lowest_student']
+    
+    def start_loading(self):
+        """Load the students on a worker thread, adding them to the window in chunks"""
+        if not self.database and not os.path.exists(self.data_file):
+            self.recover_data_file()
+            self.status_var.set(f"✅ Ready - {len(self.students)} students loaded")
+            return
+        
+        try:
+            self.load_total = self.expected_count()
+        except (OSError, sqlite3.Error) as e:
+            messagebox.showerror("Error", f"Error loading data: {str(e)}")
+            return
+        
+        self.loading = True
+        self.load_errors = []
+        self.load_queue = queue.Queue()
+        self.set_buttons_enabled(False)
+        self.load_progress.pack(side='left', padx=(5, 0))
+        self.status_var.set("⏳ Loading students...")
+        threading.Thread(target=self.load_worker, name="StudentLoader", daemon=True).start()
+        self.root.after(LOAD_POLL_MS, self.poll_loading)
+    
+    def load_worker(self):
+        """Read the data file in chunks on the loader thread"""
+        try:
+            students = self.iter_data()
+            while True:
+                chunk = list(islice(students, LOAD_CHUNK_SIZE))
+                if not chunk:
+                    break
+                for student in chunk:
+                    self.calculate_student_stats(student)
+                self.load_queue.put(chunk)
+            self.load_queue.put(None)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            self.load_queue.put(e)
+    
+    def poll_loading(self):
+        """Add the chunks loaded so far, spending only a short time per call"""
+        deadline = time.perf_counter() + LOAD_POLL_MS / 1000
+        while time.perf_counter() < deadline:
+            try:
+                item = self.load_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, list):
+                first_chunk = not self.students
+                self.add_loaded_students(item)
+                if first_chunk:
+                    self.set_buttons_enabled(False, self.LOADING_COMMANDS)
+            elif item is None or isinstance(item, Exception):
+                self.finish_loading(item)
+                return
+        
+        loaded = len(self.students)
+        self.load_progress['value'] = min(100, 100 * loaded / self.load_total) if self.load_total else 0
+        self.status_var.set(f"⏳ Loading students... {loaded:,} of {self.load_total:,}")
+        if self.table_shown:
+            self.student_table.render()
+        self.root.after(LOAD_POLL_MS, self.poll_loading)
+    
+    def finish_loading(self, error):
+        """Enable everything once the last chunk is in"""
+        self.loading = False
+        self.load_progress.pack_forget()
+        self.set_buttons_enabled(True)
+        self.status_var.set(f"✅ Ready - {len(self.students)} students loaded")
+        if self.table_shown:
+            self.student_table.render()
+        if error:
+            messagebox.showerror("Error", f"Error loading data: {str(error)}")
+        if self.load_errors:
+            self.report_load_errors()
+    
+    def set_buttons_enabled(self, enabled, except_commands=()):
+        """Enable or disable the menu buttons and File menu, leaving except_commands enabled"""
+        for name, button in self.menu_buttons.items():
+            button.state(['!disabled'] if enabled or name in except_commands else ['disabled'])
+        self.menubar.entryconfigure("File", state='normal' if enabled else 'disabled')
+    
+    def show_timing(self, event):
+        """Add the time taken by a finished button action to the status bar"""
+        if event['depth'] or not hasattr(self, 'status_var'):
+            return
+        status = self.status_var.get().split("    ⏱️")[0]
+        message = f"{status}    ⏱️ {event['name']}: {event['seconds'] * 1000:.1f} ms, {event['rows_after']} rows"
+        if 'profile' in event:
+            message += f", profile saved to {event['profile']}"
+        self.status_var.set(message)
+    
+    def profile_next_action(self):
+        """Run cProfile over the next button action"""
+        self.timer.profile_next = True
+        self.status_var.set("🔬 The next action will be profiled")
+    
+    def save_timing_trace(self):
+        """Save the recorded timings as a Chrome trace"""
+        path = filedialog.asksaveasfilename(parent=self.root, title="Save timing trace",
+                                            defaultextension=".json",
+                                            filetypes=[("Chrome trace", "*.json")])
+        if not path:
+            return
+        try:
+            self.timer.write_trace(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Error saving trace: {str(e)}")
+            return
+        self.status_var.set(f"⏱️ Saved {len(self.timer.events)} timings to {os.path.basename(path)}")
+    
+    def watch_data_file(self):
+        """Poll the data file and pick up changes made by other programs"""
+        # Wait for our own saves to land so a clash is reported when they fail
+        writing = self.writer.jobs.unfinished_tasks or not self.writer.results.empty() or self.stale_jobs
+        changes = None if writing else self.reload_changes()
+        if changes and any(changes):
+            added, updated, removed = changes
+            if self.table_shown:
+                self.student_table.render()
+            self.status_var.set(f"🔄 Reloaded from disk: {added} added, "
+                                f"{updated} updated, {removed} removed")
+        self.root.after(WATCH_INTERVAL_MS, self.watch_data_file)
+    
+    def check_writer(self):
+        """Pick up finished saves from the background writer on the Tk thread"""
+        while not self.writer.results.empty():
+            count, error, stale_jobs = self.writer.results.get()
+            self.stale_jobs += stale_jobs
+            if error:
+                self.save_status_var.set("❌ Save failed")
+                messagebox.showerror("Error", f"Error saving data: {error}")
+            elif self.writer.jobs.unfinished_tasks == 0 and not self.stale_jobs:
+                self.save_status_var.set("💾 All changes saved")
+        
+        # Jobs queued behind a stale one are stale too, so merge once they have all run
+        if self.stale_jobs and self.writer.jobs.unfinished_tasks == 0 and self.writer.results.empty():
+            stale, self.stale_jobs = self.stale_jobs, []
+            merged, conflicts = self.resolve_stale_writes(stale)
+            if self.table_shown:
+                self.student_table.render()
+            self.status_var.set(f"🔀 Merged {merged} changes from other users"
+                                + (f", {len(conflicts)} conflicts" if conflicts else ""))
+        self.root.after(100, self.check_writer)
+    
+    def create_gui(self):
+        """Create the main GUI with BSU colors"""
+        # Menu bar for file and cohort tools
+        menubar = self.menubar = tk.Menu(self.root)
+        self.file_menu = tk.Menu(menubar, tearoff=0)
+        self.file_menu.add_command(label="📂 Load Cohort Folder...", command=self.open_cohort_folder)
+        self.file_menu.add_command(label="↩️ Reopen Marks File", command=self.reopen_marks_file)
+        self.file_menu.add_command(label="📥 Import Students from CSV...", command=self.import_students_csv)
+        self.file_menu.add_separator()
+        self.file_menu.add_command(label="📦 Browse Binary Marks File...", command=self.open_binary_file)
+        self.file_menu.add_command(label="💾 Save Binary Copy...", command=self.save_binary_copy)
+        self.file_menu.add_separator()
+        self.file_menu.add_command(label="🗄️ Open SQLite Database...", command=self.open_database)
+        self.file_menu.add_separator()
+        self.file_menu.add_command(label="📝 Export Student Reports...", command=self.export_student_reports)
+        menubar.add_cascade(label="File", menu=self.file_menu)
+        self.tools_menu = tk.Menu(menubar, tearoff=0)
+        self.tools_menu.add_command(label="🏅 Rank & Range Queries...", command=self.open_rank_panel)
+        self.tools_menu.add_command(label="🎓 Grading Scheme...", command=self.edit_grading_scheme)
+        self.tools_menu.add_command(label="🕘 Snapshot History...", command=self.show_history)
+        if self.timer:
+            self.tools_menu.add_separator()
+            self.tools_menu.add_command(label="🔬 Profile Next Action", command=self.profile_next_action)
+            self.tools_menu.add_command(label="⏱️ Save Timing Trace...", command=self.save_timing_trace)
+        menubar.add_cascade(label="Tools", menu=self.tools_menu)
+        self.root.config(menu=menubar)
+        
+        # Header frame
+        header_frame = ttk.Frame(self.root, style='Primary.TFrame', height=80)
+        header_frame.pack(fill='x', padx=10, pady=10)
+        header_frame.pack_propagate(False)
+        
+        # Title
+        title_label = ttk.Label(header_frame, text="🎓 Student Management System", 
+                               style='Title.TLabel')
+        title_label.pack(pady=20)
+        
+        # Main content frame
+        main_frame = ttk.Frame(self.root, style='Light.TFrame')
+        main_frame.pack(fill='both', expand=True, padx=10, pady=10)
+        
+        # Left panel - Menu buttons
+        menu_frame = ttk.Frame(main_frame, style='Secondary.TFrame', width=250)
+        menu_frame.pack(side='left', fill='y', padx=(0, 10))
+        menu_frame.pack_propagate(False)
+        
+        # Menu title
+        menu_title = ttk.Label(menu_frame, text="Management Menu", style='Heading.TLabel')
+        menu_title.pack(pady=15)
+        
+        # Menu buttons
+        buttons = [
+            ("📊 View All Students", self.view_all_students),
+            ("👤 View Individual Student", self.view_individual_student),
+            ("🔎 Find Student by Code", self.find_student_by_code),
+            ("🏆 Highest Scoring Student", self.show_highest_student),
+            ("📉 Lowest Scoring Student", self.show_lowest_student),
+            ("🔍 Sort Students", self.sort_students),
+            ("➕ Add Student", self.add_student),
+            ("🗑️ Delete Student", self.delete_student),
+            ("✏️ Update Student", self.update_student)
+        ]
+        
+        # Buttons are kept by handler name so they can be disabled while loading
+        self.menu_buttons = {}
+        for text, command in buttons:
+            btn = ttk.Button(menu_frame, text=text, command=command, 
+                           style='Primary.TButton', width=20)
+            btn.pack(pady=8, padx=10, fill='x')
+            self.menu_buttons[command.__name__] = btn
+        
+        # Right panel - Results
+        results_frame = ttk.Frame(main_frame, style='Light.TFrame')
+        results_frame.pack(side='right', fill='both', expand=True)
+        
+        # Results title
+        results_title = ttk.Label(results_frame, text="Student Records", 
+                                style='Heading.TLabel')
+        results_title.pack(pady=10)
+        
+        # Filter box, e.g. exam > 80 and grade == 'B'
+        query_frame = ttk.Frame(results_frame, style='Light.TFrame')
+        query_frame.pack(fill='x', pady=(0, 5))
+        ttk.Label(query_frame, text="🔎 Filter:", style='Normal.TLabel').pack(side='left')
+        self.query_var = tk.StringVar()
+        query_entry = ttk.Entry(query_frame, textvariable=self.query_var, font=('Consolas', 10))
+        query_entry.pack(side='left', fill='x', expand=True, padx=5)
+        query_entry.bind('<Return>', self.run_query)
+        ttk.Button(query_frame, text="Apply", command=self.run_query,
+                   style='Primary.TButton').pack(side='left')
+        
+        # Text widget for displaying results with custom styling
+        self.text_frame = ttk.Frame(results_frame, style='Light.TFrame')
+        self.text_frame.pack(fill='both', expand=True)
+        self.results_text = tk.Text(self.text_frame, 
+                                   width=70, 
+                                   height=25, 
+                                   wrap=tk.WORD,
+                                   bg='#FFFFFF',
+                                   fg=self.colors['text_dark'],
+                                   font=('Consolas', 10),
+                                   relief='solid',
+                                   borderwidth=1)
+        
+        scrollbar = ttk.Scrollbar(self.text_frame, orient=tk.VERTICAL, command=self.results_text.yview)
+        self.results_text.configure(yscrollcommand=scrollbar.set)
+        
+        self.results_text.pack(side='left', fill='both', expand=True, padx=(0, 5))
+        scrollbar.pack(side='right', fill='y')
+        
+        # Virtualized table used for long student listings
+        self.table_frame = ttk.Frame(results_frame, style='Light.TFrame')
+        self.student_table = VirtualTable(self.table_frame, on_open=self.show_individual_student,
+                                          row_format=self.cached_row, style='Light.TFrame')
+        self.student_table.pack(fill='both', expand=True)
+        for grade, color in (('a', '#2E7D32'), ('b', '#689F38'), ('c', '#F57C00'),
+                             ('d', '#EF6C00'), ('f', '#C62828')):
+            self.student_table.tag_configure(f'grade_{grade}', foreground=color)
+        
+        self.table_shown = False
+        self.table_summary_var = tk.StringVar()
+        ttk.Label(self.table_frame, textvariable=self.table_summary_var,
+                  style='Normal.TLabel').pack(fill='x', pady=(5, 0))
+        
+        # Status bar, with the background save state on the right
+        status_frame = ttk.Frame(self.root, style='Light.TFrame')
+        status_frame.pack(side='bottom', fill='x', padx=10, pady=5)
+        
+        self.save_status_var = tk.StringVar(value="💾 All changes saved")
+        ttk.Label(status_frame, textvariable=self.save_status_var, style='Normal.TLabel',
+                  relief='sunken', anchor='e').pack(side='right')
+        
+        self.status_var = tk.StringVar()
+        self.status_var.set(f"✅ Ready - {len(self.students)} students loaded")
+        status_bar = ttk.Label(status_frame, textvariable=self.status_var, 
+                              style='Normal.TLabel', relief='sunken', anchor='w')
+        status_bar.pack(side='left', fill='x', expand=True)
+        
+        # Shown only while students are loading
+        self.load_progress = ttk.Progressbar(status_frame, mode='determinate', length=150)
+        
+        self.configure_text_tags()
+    
+    def show_text_view(self):
+        """Show the results text area instead of the student table"""
+        if self.table_shown:
+            self.table_frame.pack_forget()
+            self.text_frame.pack(fill='both', expand=True)
+            self.table_shown = False
+    
+    def show_table_view(self):
+        """Show the student table instead of the results text area"""
+        if not self.table_shown:
+            self.text_frame.pack_forget()
+            self.table_frame.pack(fill='both', expand=True)
+            self.table_shown = True
+    
+    def clear_results(self):
+        """Clear the results text area"""
+        self.show_text_view()
+        self.results_text.delete(1.0, tk.END)
+    
+    def display_students(self, students):
+        """Display students under a column header with one bulk insert"""
+        chunks = [f"{'Name':<20} {'Code':<8} {'Coursework':<12} {'Exam':<6} {'Percentage':<12} {'Grade':<6}\n", 'header',
+                  "─" * 75 + "\n", 'separator']
+        for student in students:
+            _, tag, text, grade_text = self.cached_row(student)
+            chunks += (text, 'normal', grade_text, tag)
+        self.results_text.insert(tk.END, *chunks)
+    
+    def configure_text_tags(self):
+        """Configure text colors for the results display"""
+        self.results_text.tag_configure('header', foreground=self.colors['primary'], font=('Consolas', 10, 'bold'))
+        self.results_text.tag_configure('separator', foreground=self.colors['accent'])
+        self.results_text.tag_configure('normal', foreground=self.colors['text_dark'])
+        self.results_text.tag_configure('grade_a', foreground='#2E7D32', font=('Consolas', 10, 'bold'))  # Green
+        self.results_text.tag_configure('grade_b', foreground='#689F38', font=('Consolas', 10, 'bold'))  # Light Green
+        self.results_text.tag_configure('grade_c', foreground='#F57C00', font=('Consolas', 10, 'bold'))  # Orange
+        self.results_text.tag_configure('grade_d', foreground='#EF6C00', font=('Consolas', 10, 'bold'))  # Dark Orange
+        self.results_text.tag_configure('grade_f', foreground='#C62828', font=('Consolas', 10, 'bold'))  # Red
+        self.results_text.tag_configure('summary', foreground=self.colors['primary'], font=('Consolas', 10, 'bold'))
+    
+    def view_all_students(self):
+        """View all student records"""
+        if not self.students:
+            self.clear_results()
+            self.results_text.insert(tk.END, "No student records found.\n")
+            return
+        
+        summary = self.cohort_summary()
+        
+        if len(self.students) <= VIEW_ALL_TEXT_LIMIT:
+            self.clear_results()
+            self.results_text.insert(tk.END, "🎓 ALL STUDENT RECORDS\n\n", 'header')
+            self.display_students(self.students)
+            
+            # Display summary
+            self.results_text.insert(tk.END, "\n" + "═" * 75 + "\n", 'separator',
+                                     "SUMMARY:\n", 'summary',
+                                     f"📊 Number of students: {summary['count']}\n", (),
+                                     f"📈 Average percentage: {summary['average']:.1f}%\n", ())
+        else:
+            # Only the rows on screen are rendered, however many students there are
+            self.show_table_view()
+            self.student_table.set_rows(self.students)
+            self.table_summary_var.set(f"📊 Number of students: {summary['count']}    "
+                                       f"📈 Average percentage: {summary['average']:.1f}%")
+        
+        self.status_var.set(f"📊 Displaying all {len(self.students)} students")
+    
+    def open_cohort_folder(self):
+        """Merge every marks file in a folder into one cohort"""
+        folder = filedialog.askdirectory(parent=self.root, title="Select cohort folder")
+        if not folder:
+            return
+        
+        try:
+            stats, conflicts = self.load_cohorts(folder)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Error loading cohorts: {str(e)}")
+            return
+        
+        if self.load_errors:
+            self.report_load_errors()
+        if conflicts:
+            lines = [f"Code {code}: kept {os.path.basename(kept)}, "
+                     f"{'duplicate' if identical else 'conflict'} in {os.path.basename(other)}"
+                     for code, kept, other, identical in conflicts[:10]]
+            if len(conflicts) > 10:
+                lines.append(f"... and {len(conflicts) - 10} more")
+            messagebox.showwarning("Warning", f"{len(conflicts)} student codes appear in more than one file:\n\n"
+                                   + "\n".join(lines))
+        
+        self.view_all_students()
+        self.status_var.set(f"📂 Merged {stats.count} students from {folder} "
+                            f"(average {stats.summary()['average']:.1f}%, read-only)")
+    
+    def reopen_marks_file(self):
+        """Go back from a merged cohort to the marks file or database for editing"""
+        if not self.read_only:
+            messagebox.showinfo("Info", "The marks file is already open.")
+            return
+        super().reopen_marks_file()
+        self.view_all_students()
+        self.status_var.set(f"↩️ Reopened {self.data_file} - {len(self.students)} students loaded")
+    
+    def check_editable(self):
+        """Return whether students can be changed, explaining why not for merged cohorts"""
+        if self.read_only:
+            messagebox.showinfo("Read-only", "Merged cohorts are read-only. "
+                                "Use File > Reopen Marks File to edit students again.")
+            return False
+        return True
+    
+    def check_still_present(self, student):
+        """Return whether a student chosen in a dialog is still loaded, explaining if not"""
+        if self.find_student(student['code']) is student:
+            return True
+        messagebox.showwarning("Student Removed",
+                               f"{student['name']} ({student['code']}) was removed by another user "
+                               "while the dialog was open.")
+        self.view_all_students()
+        return False
+    
+    def import_students_csv(self):
+        """Bulk import students from a CSV file"""
+        if not self.check_editable():
+            return
+        path = filedialog.askopenfilename(parent=self.root, title="Import students",
+                                          filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        
+        try:
+            added, errors = self.import_csv(path)
+        except (OSError, csv.Error) as e:
+            messagebox.showerror("Error", f"Error reading CSV: {str(e)}")
+            return
+        
+        if errors:
+            # Every problem is listed together so the file can be fixed in one go
+            self.clear_results()
+            self.results_text.insert(tk.END, f"❌ IMPORT FAILED - {len(errors)} PROBLEMS\n\n", 'grade_f',
+                                     "".join(f"Row {row_number}: {message}\n" for row_number, message in errors),
+                                     ())
+            self.status_var.set(f"❌ Import failed: {len(errors)} problems in {os.path.basename(path)}")
+            return
+        
+        self.view_all_students()
+        self.status_var.set(f"📥 Imported {len(added)} students from {os.path.basename(path)}")
+    
+    def open_binary_file(self):
+        """Browse a binary marks file through the virtual table without loading it"""
+        path = filedialog.askopenfilename(parent=self.root, title="Open binary marks file",
+                                          filetypes=[("Binary marks", f"*{BINARY_EXTENSION}")])
+        if not path:
+            return
+        
+        try:
+            binary_file = BinaryMarksFile(path, self.scheme)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Error opening file: {str(e)}")
+            return
+        
+        if self.binary_file:
+            self.binary_file.close()
+        self.binary_file = binary_file
+        
+        # Rows are decoded from the mapped file only as they scroll into view
+        self.show_table_view()
+        self.student_table.set_rows(binary_file,
+                                    row_format=lambda student: student_row_values(student, binary_file.scheme))
+        self.table_summary_var.set(f"📦 {os.path.basename(path)}: {len(binary_file)} students (read-only)")
+        self.status_var.set(f"📦 Browsing {path}")
+    
+    def save_binary_copy(self):
+        """Write the current students to a binary marks file"""
+        path = filedialog.asksaveasfilename(parent=self.root, title="Save binary copy",
+                                            defaultextension=BINARY_EXTENSION,
+                                            filetypes=[("Binary marks", f"*{BINARY_EXTENSION}")])
+        if not path:
+            return
+        
+        try:
+            count = write_binary_marks(path, self.students)
+        except (OSError, struct.error) as e:
+            messagebox.showerror("Error", f"Error saving data: {str(e)}")
+            return
+        self.status_var.set(f"💾 Saved {count} students to {path}")
+    
+    def open_database(self):
+        """Switch to a SQLite database, offering to migrate the current students into a new one"""
+        path = filedialog.asksaveasfilename(parent=self.root, title="Open or create SQLite database",
+                                            defaultextension='.db', confirmoverwrite=False,
+                                            filetypes=[("SQLite database", "*.db *.sqlite *.sqlite3")])
+        if not path:
+            return
+        if not path.endswith(DATABASE_EXTENSIONS):
+            path += '.db'
+        
+        try:
+            database = SQLiteBackend(path)
+            is_empty = database.count() == 0
+            if is_empty and self.students and messagebox.askyesno(
+                    "Migrate", f"The database is empty. Copy the current {len(self.students)} students into it?"):
+                database.replace_all(self.students)
+            database.close()
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Error opening database: {str(e)}")
+            return
+        
+        self.open_data_file(path)
+        self.view_all_students()
+        self.status_var.set(f"🗄️ Using database {path} - {len(self.students)} students loaded")
+    
+    def export_student_reports(self):
+        """Write a report file for every student, in the background"""
+        if not self.students:
+            messagebox.showinfo("Info", "No student records found.")
+            return
+        directory = filedialog.askdirectory(parent=self.root, title="Select folder for reports")
+        if not directory:
+            return
+        
+        # The workers read a snapshot, so editing can carry on during the export
+        students = self.snapshot_students()
+        updates = queue.Queue()
+        
+        def export():
+            try:
+                updates.put(('done', self.export_reports(directory, students=students,
+                                                         progress=lambda *counts: updates.put(counts))))
+            except Exception as e:
+                updates.put(('error', e))
+        
+        def check_progress():
+            while not updates.empty():
+                first, second = updates.get()
+                if first == 'done' or first == 'error':
+                    self.load_progress.pack_forget()
+                    if first == 'error':
+                        self.status_var.set("❌ Report export failed")
+                        messagebox.showerror("Error", f"Error exporting reports: {str(second)}")
+                    else:
+                        self.status_var.set(f"📝 Wrote {second} reports to {directory}")
+                    return
+                self.load_progress['value'] = 100 * first / second if second else 100
+                self.status_var.set(f"📝 Writing reports... {first:,} of {second:,}")
+            self.root.after(100, check_progress)
+        
+        self.load_progress['value'] = 0
+        self.load_progress.pack(side='left', padx=(5, 0))
+        self.status_var.set(f"📝 Writing {len(students):,} reports...")
+        threading.Thread(target=export, name="ReportExport", daemon=True).start()
+        self.root.after(100, check_progress)
+    
+    def view_individual_student(self):
+        """View individual student record"""
+        if not self.students:
+            messagebox.showinfo("Info", "No student records found.")
+            return
+        
+        self.create_selection_dialog("Select Student", "Select a student to view:",
+                                   self.show_individual_student)
+    
+    def find_student_by_code(self):
+        """Jump straight to a student by entering their code"""
+        code = simpledialog.askinteger("Find Student", "Enter student code:", parent=self.root)
+        if code is None:
+            return
+        
+        student = self.find_student(code)
+        if student is None:
+            messagebox.showinfo("Info", f"No student found with code {code}.")
+            return
+        self.show_individual_student(student)
+    
+    def show_individual_student(self, student):
+        """Show individual student details"""
+        self.clear_results()
+        
+        self.results_text.insert(tk.END, REPORT_TITLE + "\n\n", 'header')
+        
+        # Same layout as the exported report files
+        for line in format_student_report(student):
+            if 'Grade:' in line:
+                self.results_text.insert(tk.END, line + '\n', grade_tag(student['grade'], self.scheme))
+            else:
+                self.results_text.insert(tk.END, line + '\n')
+        
+        self.status_var.set(f"👤 Viewing {student['name']}'s record")
+    
+    def show_highest_student(self):
+        """Show student with highest overall mark"""
+        if not self.students:
+            messagebox.showinfo("Info", "No student records found.")
+            return
+        
+        # While loading this is the highest of the students loaded so far
+        highest_student = self.highest_student()
+        so_far = " SO FAR" if self.loading else ""
+        self.show_individual_student(highest_student)
+        self.results_text.insert(tk.END, f"\n🏆 THIS STUDENT HAS THE HIGHEST SCORE{so_far}!", 'grade_a')
+        self.status_var.set(f"🏆 Highest scoring student{so_far.lower()}: {highest_student['name']}")
+    
+    def show_lowest_student(self):
+        """Show student with lowest overall mark"""
+        if not self.students:
+            messagebox.showinfo("Info", "No student records found.")
+            return
+        
+        lowest_student = self.lowest_student()
+        so_far = " SO FAR" if self.loading else ""
+        self.show_individual_student(lowest_student)
+        self.results_text.insert(tk.END, f"\n📉 THIS STUDENT HAS THE LOWEST SCORE{so_far}", 'grade_f')
+        self.status_var.set(f"📉 Lowest scoring student{so_far.lower()}: {lowest_student['name']}")
+    
+    def open_rank_panel(self):
+        """Open a panel for rank, top N and percentage range queries"""
+        if not self.students:
+            messagebox.showinfo("Info", "No student records found.")
+            return
+        
+        panel = tk.Toplevel(self.root)
+        panel.title("Rank & Range Queries")
+        panel.geometry("320x360")
+        panel.configure(bg=self.colors['light'])
+        panel.transient(self.root)
+        
+        ttk.Label(panel, text="Rank of student code:", style='Heading.TLabel').pack(pady=(10, 5))
+        code_var = tk.StringVar()
+        ttk.Entry(panel, textvariable=code_var, width=15).pack()
+        
+        def show_rank():
+            try:
+                student = self.find_student(int(code_var.get()))
+            except ValueError:
+                student = None
+            if student is None:
+                messagebox.showerror("Error", "No student found with that code", parent=panel)
+                return
+            rank = self.rank_of(student)
+            self.show_individual_student(student)
+            self.results_text.insert(tk.END, f"\n🏅 RANKED {rank} OF {len(self.students)}", 'summary')
+            self.status_var.set(f"🏅 {student['name']} is ranked {rank} of {len(self.students)}")
+        
+        ttk.Button(panel, text="Show Rank", command=show_rank, style='Primary.TButton').pack(pady=5)
+        
+        ttk.Label(panel, text="Top students:", style='Heading.TLabel').pack(pady=(10, 5))
+        top_var = tk.IntVar(value=10)
+        ttk.Spinbox(panel, from_=1, to=max(1, len(self.students)), textvariable=top_var, width=13).pack()
+        
+        def show_top():
+            try:
+                count = top_var.get()
+            except tk.TclError:
+                messagebox.showerror("Error", "Please enter a number", parent=panel)
+                return
+            self.show_ranked_students(f"🏆 TOP {count} STUDENTS", self.top_students(count))
+        
+        ttk.Button(panel, text="Show Top", command=show_top, style='Primary.TButton').pack(pady=5)
+        
+        ttk.Label(panel, text="Percentage range:", style='Heading.TLabel').pack(pady=(10, 5))
+        range_frame = ttk.Frame(panel, style='Light.TFrame')
+        range_frame.pack()
+        low_var = tk.StringVar(value="50")
+        high_var = tk.StringVar(value="60")
+        ttk.Entry(range_frame, textvariable=low_var, width=6).pack(side='left')
+        ttk.Label(range_frame, text=" to ", style='Normal.TLabel').pack(side='left')
+        ttk.Entry(range_frame, textvariable=high_var, width=6).pack(side='left')
+        
+        def show_range():
+            try:
+                low, high = float(low_var.get()), float(high_var.get())
+            except ValueError:
+                messagebox.showerror("Error", "Please enter percentages as numbers", parent=panel)
+                return
+            self.show_ranked_students(f"📊 STUDENTS FROM {low:g}% TO {high:g}%",
+                                      self.students_between(low, high))
+        
+        ttk.Button(panel, text="Show Range", command=show_range, style='Primary.TButton').pack(pady=5)
+    
+    def edit_grading_scheme(self):
+        """Edit the grade boundaries and coursework weight, then regrade the cohort"""
+        if self.loading:
+            messagebox.showinfo("Info", "Please wait until the students have loaded.")
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Grading Scheme")
+        dialog.configure(bg=self.colors['light'])
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        ttk.Label(dialog, text="Minimum percentage for each grade:",
+                  style='Heading.TLabel').grid(row=0, column=0, columnspan=2, pady=10, padx=10)
+        boundary_vars = []
+        for row, (boundary, grade) in enumerate(self.scheme.boundaries, start=1):
+            ttk.Label(dialog, text=f"{grade}:", style='Normal.TLabel').grid(row=row, column=0, sticky='e', padx=5)
+            var = tk.StringVar(value=f"{boundary:g}")
+            ttk.Entry(dialog, textvariable=var, width=8).grid(row=row, column=1, sticky='w', pady=2)
+            boundary_vars.append((grade, var))
+        
+        row = len(boundary_vars) + 1
+        ttk.Label(dialog, text="Coursework weight % (blank = marks out of 160):",
+                  style='Normal.TLabel').grid(row=row, column=0, columnspan=2, pady=(10, 2), padx=10)
+        weight = self.scheme.coursework_weight
+        weight_var = tk.StringVar(value="" if weight is None else f"{weight:g}")
+        ttk.Entry(dialog, textvariable=weight_var, width=8).grid(row=row + 1, column=0, columnspan=2)
+        
+        def apply(scheme):
+            self.regrade_cohort(scheme)
+            try:
+                self.save_grading_scheme()
+            except OSError as e:
+                messagebox.showerror("Error", f"Error saving grading scheme: {str(e)}", parent=dialog)
+            dialog.destroy()
+            self.view_all_students()
+            self.status_var.set(f"🎓 Regraded {len(self.students)} students")
+        
+        def apply_entries():
+            try:
+                weight = weight_var.get().strip()
+                apply(GradingScheme([(float(var.get()), grade) for grade, var in boundary_vars],
+                                    self.scheme.fail_grade, float(weight) if weight else None))
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid grading scheme: {str(e)}", parent=dialog)
+        
+        def load_file():
+            path = filedialog.askopenfilename(parent=dialog, title="Load grading scheme",
+                                              filetypes=[("JSON files", "*.json")])
+            if not path:
+                return
+            try:
+                apply(GradingScheme.from_file(path))
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Error", f"Error loading grading scheme: {str(e)}", parent=dialog)
+        
+        button_frame = ttk.Frame(dialog, style='Light.TFrame')
+        button_frame.grid(row=row + 2, column=0, columnspan=2, pady=10)
+        ttk.Button(button_frame, text="Regrade", command=apply_entries,
+                   style='Primary.TButton').pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Load JSON...", command=load_file,
+                   style='Primary.TButton').pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Default", command=lambda: apply(DEFAULT_SCHEME),
+                   style='Primary.TButton').pack(side='left', padx=5)
+    
+    def show_history(self):
+        """List the saved snapshots of the data file, to diff or restore"""
+        history = self.history()
+        if history is None or self.loading:
+            messagebox.showinfo("Info", "Snapshot history is only kept for a loaded marks file.")
+            return
+        ids = history.ids()
+        if not ids:
+            messagebox.showinfo("Info", "No snapshots yet. One is taken every time the file is saved.")
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Snapshot History")
+        dialog.geometry("360x380")
+        dialog.configure(bg=self.colors['light'])
+        dialog.transient(self.root)
+        
+        ttk.Label(dialog, text="Saved snapshots:", style='Heading.TLabel').pack(pady=10)
+        listbox = tk.Listbox(dialog, font=('Consolas', 10), height=12)
+        listbox.pack(fill='both', expand=True, padx=10)
+        for snapshot_id in reversed(ids):
+            manifest = history.manifest(snapshot_id)
+            listbox.insert(tk.END, f"{snapshot_id}  {manifest['time']}  {manifest['count']} students")
+        listbox.selection_set(0)
+        
+        def selected():
+            selection = listbox.curselection()
+            return ids[-1 - selection[0]] if selection else None
+        
+        def show_diff():
+            snapshot_id = selected()
+            if snapshot_id is None:
+                return
+            added, changed, removed = history.diff(snapshot_id, ids[-1])
+            self.clear_results()
+            self.results_text.insert(tk.END, f"🕘 CHANGES FROM SNAPSHOT {snapshot_id} TO {ids[-1]}\n\n", 'header')
+            lines = format_snapshot_diff(added, changed, removed)
+            self.results_text.insert(tk.END, "\n".join(lines) + "\n" if lines else "No changes.\n")
+            self.status_var.set(f"🕘 {len(added)} added, {len(changed)} changed, {len(removed)} removed "
+                                f"since snapshot {snapshot_id}")
+        
+        def restore():
+            snapshot_id = selected()
+            if snapshot_id is None or not messagebox.askyesno(
+                    "Restore", f"Restore snapshot {snapshot_id}? The current version is kept as a snapshot.",
+                    parent=dialog):
+                return
+            result = self.restore_snapshot(snapshot_id)
+            dialog.destroy()
+            if result is not None:
+                added, changed, removed = result
+                self.view_all_students()
+                self.status_var.set(f"🕘 Restored snapshot {snapshot_id}: {len(added)} added, "
+                                    f"{len(changed)} changed, {len(removed)} removed")
+        
+        button_frame = ttk.Frame(dialog, style='Light.TFrame')
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="Diff with Latest", command=show_diff,
+                   style='Primary.TButton').pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Restore", command=restore,
+                   style='Primary.TButton').pack(side='left', padx=5)
+    
+    def run_query(self, event=None):
+        """Show the students matching the expression in the filter box"""
+        text = self.query_var.get().strip()
+        if not text:
+            self.view_all_students()
+            return
+        try:
+            students = self.query_students(text)
+        except QueryError as e:
+            messagebox.showerror("Filter Error", f"Invalid filter: {e}")
+            return
+        self.show_ranked_students("🔎 FILTERED STUDENTS", students)
+        self.status_var.set(f"🔎 {len(students)} students match: {text}")
+    
+    def show_ranked_students(self, title, students):
+        """Show the result of a rank or filter query, in the order given"""
+        if len(students) <= VIEW_ALL_TEXT_LIMIT:
+            self.clear_results()
+            self.results_text.insert(tk.END, title + "\n\n", 'header')
+            self.display_students(students)
+        else:
+            self.show_table_view()
+            self.student_table.set_rows(students)
+            self.table_summary_var.set(title)
+        self.status_var.set(f"{title.title()}: {len(students)} students")
+    
+    def create_selection_dialog(self, title, message, callback):
+        """Create a reusable selection dialog"""
+        selection_dialog = tk.Toplevel(self.root)
+        selection_dialog.title(title)
+        selection_dialog.geometry("400x350")
+        selection_dialog.configure(bg=self.colors['light'])
+        selection_dialog.transient(self.root)
+        selection_dialog.grab_set()
+        
+        # Center the dialog
+        selection_dialog.update_idletasks()
+        x = (self.root.winfo_screenwidth() // 2) - (400 // 2)
+        y = (self.root.winfo_screenheight() // 2) - (350 // 2)
+        selection_dialog.geometry(f"+{x}+{y}")
+        
+        ttk.Label(selection_dialog, text=message, style='Heading.TLabel').pack(pady=10)
+        
+        # Type-ahead search box over names and codes
+        self.build_search_index()
+        search_var = tk.StringVar()
+        search_entry = ttk.Entry(selection_dialog, textvariable=search_var, font=('Arial', 10))
+        search_entry.pack(padx=20, fill='x')
+        search_entry.focus_set()
+        
+        listbox = tk.Listbox(selection_dialog, 
+                           bg='white', 
+                           fg=self.colors['text_dark'],
+                           font=('Arial', 10),
+                           selectbackground=self.colors['secondary'])
+        listbox.pack(pady=10, padx=20, fill='both', expand=True)
+        
+        # Only the top matches are ever put in the listbox
+        matches = []
+        
+        def refresh(*args):
+            matches[:] = self.search_students(search_var.get())
+            listbox.delete(0, tk.END)
+            listbox.insert(tk.END, *[f"{student['code']} - {student['name']} ({student['grade']})"
+                                     for student in matches])
+            if matches:
+                listbox.selection_set(0)
+        
+        def on_select(*args):
+            selection = listbox.curselection()
+            if selection:
+                selected_student = matches[selection[0]]
+                selection_dialog.destroy()
+                callback(selected_student)
+        
+        search_var.trace_add('write', refresh)
+        search_entry.bind('<Return>', on_select)
+        listbox.bind('<Double-1>', on_select)
+        refresh()
+        
+        ttk.Button(selection_dialog, text="Select", command=on_select, 
+                  style='Primary.TButton').pack(pady=10)
+    
+    def sort_students(self):
+        """Sort student records"""
+        if not self.students:
+            messagebox.showinfo("Info", "No student records found.")
+            return
+        
+        sort_dialog = tk.Toplevel(self.root)
+        sort_dialog.title("Sort Students")
+        sort_dialog.geometry("300x420")
+        sort_dialog.configure(bg=self.colors['light'])
+        sort_dialog.transient(self.root)
+        sort_dialog.grab_set()
+        
+        ttk.Label(sort_dialog, text="Sort by:", style='Heading.TLabel').pack(pady=10)
+        
+        sort_var = tk.StringVar(value="percentage")
+        ttk.Radiobutton(sort_dialog, text="📊 Percentage", variable=sort_var, value="percentage").pack(pady=5)
+        ttk.Radiobutton(sort_dialog, text="📛 Name", variable=sort_var, value="name").pack(pady=5)
+        ttk.Radiobutton(sort_dialog, text="🔢 Student Code", variable=sort_var, value="code").pack(pady=5)
+        ttk.Radiobutton(sort_dialog, text="🎓 Grade", variable=sort_var, value="grade").pack(pady=5)
+        
+        # Optional second key for ties, e.g. grade then name
+        ttk.Label(sort_dialog, text="Then by:", style='Normal.TLabel').pack(pady=5)
+        then_var = tk.StringVar(value="none")
+        ttk.Combobox(sort_dialog, textvariable=then_var, state='readonly', width=15,
+                     values=["none", "percentage", "name", "code", "grade"]).pack(pady=5)
+        
+        order_var = tk.StringVar(value="desc")
+        ttk.Radiobutton(sort_dialog, text="⬇️ Descending", variable=order_var, value="desc").pack(pady=5)
+        ttk.Radiobutton(sort_dialog, text="⬆️ Ascending", variable=order_var, value="asc").pack(pady=5)
+        
+        def perform_sort():
+            keys = [sort_var.get()]
+            if then_var.get() not in ("none", keys[0]):
+                keys.append(then_var.get())
+            reverse = (order_var.get() == "desc")
+            
+            self.apply_sort(keys, reverse)
+            icons = {"percentage": "📊", "name": "📛", "code": "🔢", "grade": "🎓"}
+            self.status_var.set(f"{icons[keys[0]]} Students sorted by {' then '.join(keys)}")
+            
+            sort_dialog.destroy()
+            self.view_all_students()
+        
+        ttk.Button(sort_dialog, text="Sort", command=perform_sort, 
+                  style='Primary.TButton').pack(pady=10)
+    
+    def add_student(self):
+        """Add a new student record"""
+        if not self.check_editable():
+            return
+        self.create_student_form("Add New Student", None)
+    
+    def delete_student(self):
+        """Delete a student record"""
+        if not self.check_editable():
+            return
+        if not self.students:
+            messagebox.showinfo("Info", "No student records found.")
+            return
+        
+        self.create_selection_dialog("Delete Student", "Select student to delete:",
+                                   self.confirm_delete_student)
+    
+    def confirm_delete_student(self, student):
+        """Confirm and delete student"""
+        if messagebox.askyesno("Confirm Delete", 
+                              f"Are you sure you want to delete {student['name']}?"):
+            if not self.check_still_present(student):
+                return
+            self.remove_student(student)
+            self.invalidate_row(student)
+            if self.save_change('delete', student):
+                messagebox.showinfo("Success", "Student deleted successfully!")
+                self.view_all_students()
+                self.status_var.set(f"🗑️ Deleted student: {student['name']}")
+    
+    def update_student(self):
+        """Update a student record"""
+        if not self.check_editable():
+            return
+        if not self.students:
+            messagebox.showinfo("Info", "No student records found.")
+            return
+        
+        self.create_selection_dialog("Update Student", "Select student to update:",
+                                   self.create_update_form)
+    
+    def create_student_form(self, title, student):
+        """Create a form for adding/updating students"""
+        is_update = student is not None
+        
+        form_dialog = tk.Toplevel(self.root)
+        form_dialog.title(title)
+        form_dialog.geometry("400x500")
+        form_dialog.configure(bg=self.colors['light'])
+        form_dialog.transient(self.root)
+        form_dialog.grab_set()
+        
+        # Form fields
+        fields = []
+        
+        if not is_update:
+            ttk.Label(form_dialog, text="Student Code:", style='Normal.TLabel').pack(pady=5)
+            code_entry = ttk.Entry(form_dialog, font=('Arial', 10))
+            code_entry.pack(pady=5)
+            fields.append(('code', code_entry))
+        
+        ttk.Label(form_dialog, text="Student Name:", style='Normal.TLabel').pack(pady=5)
+        name_entry = ttk.Entry(form_dialog, font=('Arial', 10))
+        name_entry.pack(pady=5)
+        if is_update:
+            name_entry.insert(0, student['name'])
+        fields.append(('name', name_entry))
+        
+        ttk.Label(form_dialog, text="Coursework Marks (out of 20):", style='Normal.TLabel').pack(pady=10)
+        
+        for i in range(3):
+            ttk.Label(form_dialog, text=f"Mark {i+1}:", style='Normal.TLabel').pack()
+            mark_entry = ttk.Entry(form_dialog, font=('Arial', 10))
+            mark_entry.pack(pady=2)
+            if is_update:
+                mark_entry.insert(0, str(student['course_marks'][i]))
+            fields.append((f'mark{i+1}', mark_entry))
+        
+        ttk.Label(form_dialog, text="Exam Mark (out of 100):", style='Normal.TLabel').pack(pady=10)
+        exam_entry = ttk.Entry(form_dialog, font=('Arial', 10))
+        exam_entry.pack(pady=5)
+        if is_update:
+            exam_entry.insert(0, str(student['exam_mark']))
+        fields.append(('exam', exam_entry))
+        
+        def save_student():
+            try:
+                data = {}
+                for field_name, entry in fields:
+                    if field_name == 'code':
+                        data['code'] = int(entry.get())
+                    elif field_name == 'name':
+                        data['name'] = entry.get()
+                    elif field_name.startswith('mark'):
+                        data.setdefault('marks', []).append(int(entry.get()))
+                    elif field_name == 'exam':
+                        data['exam'] = int(entry.get())
+                
+                # Validation
+                error = validate_student(data.get('code'), data['marks'], data['exam'], data['name'])
+                if error:
+                    messagebox.showerror("Error", error)
+                    return
+                
+                if is_update:
+                    # Update existing student, unless another user removed it meanwhile
+                    if not self.check_still_present(student):
+                        form_dialog.destroy()
+                        return
+                    student['name'] = data['name']
+                    student['course_marks'] = data['marks']
+                    student['exam_mark'] = data['exam']
+                    student['total_coursework'] = sum(data['marks'])
+                    self.calculate_student_stats(student)
+                    self.student_changed(student)
+                    changed = ('update', student)
+                    message = "Student updated successfully!"
+                    action = "updated"
+                else:
+                    # Check if code already exists
+                    if data['code'] in self.by_code:
+                        messagebox.showerror("Error", "Student code already exists")
+                        return
+                    
+                    # Create new student
+                    new_student = {
+                        'code': data['code'],
+                        'name': data['name'],
+                        'course_marks': data['marks'],
+                        'exam_mark': data['exam'],
+                        'total_coursework': sum(data['marks'])
+                    }
+                    self.calculate_student_stats(new_student)
+                    new_student = self.insert_student(new_student)
+                    changed = ('add', new_student)
+                    message = "Student added successfully!"
+                    action = "added"
+                
+                if self.save_change(*changed):
+                    form_dialog.destroy()
+                    messagebox.showinfo("Success", message)
+                    self.view_all_students()
+                    self.status_var.set(f"✅ Student {action}: {data['name']}")
+                
+            except ValueError:
+                messagebox.showerror("Error", "Please enter valid numbers for all marks and code")
+        
+        ttk.Button(form_dialog, text="Save", command=save_student, 
+                  style='Primary.TButton').pack(pady=20)
+    
+    def create_update_form(self, student):
+        """Create update form for existing student"""
+        self.create_student_form("Update Student", student)
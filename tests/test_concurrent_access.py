@@ -0,0 +1,120 @@
+"""Tests for merging changes between Student Manager instances sharing a marks file"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import student_core as sm
+
+
+class RecordingCore(sm.StudentCore):
+    """StudentCore that keeps warnings instead of printing them"""
+
+    def __init__(self, *args, **kwargs):
+        self.warnings = []
+        super().__init__(*args, **kwargs)
+
+    def report_warning(self, message):
+        self.warnings.append(message)
+
+
+class ConcurrentAccessTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.directory, 'marks.txt')
+        sm.generate_marks_file(self.data_file, 20, seed=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def edit(self, core, code, exam):
+        """Change a student's exam mark and save it"""
+        student = core.find_student(code)
+        student['exam_mark'] = exam
+        core.calculate_student_stats(student)
+        core.student_changed(student)
+        core.save_change('update', student)
+
+    def replace_line(self, code, line):
+        """Rewrite one student's line the way a program unaware of versions would"""
+        with open(self.data_file) as file:
+            lines = file.readlines()
+        lines = [line + "\n" if old.startswith(f"{code},") else old for old in lines]
+        with open(self.data_file, 'w') as file:
+            file.writelines(lines)
+
+    def exam_marks(self, *codes):
+        fresh = RecordingCore(self.data_file)
+        return [fresh.find_student(code)['exam_mark'] for code in codes]
+
+    def test_upstream_line_without_version_beats_local_edit(self):
+        core = RecordingCore(self.data_file)
+        self.edit(core, 1001, 99)
+        core.compact_journal()
+
+        self.replace_line(1001, "1001,Upstream Name,1,2,3,40")
+        self.assertEqual(core.reload_changes(), (0, 1, 0))
+        self.assertEqual(core.find_student(1001)['name'], "Upstream Name")
+
+        core.save_data()
+        fresh = RecordingCore(self.data_file)
+        self.assertEqual(fresh.find_student(1001)['name'], "Upstream Name")
+        self.assertEqual(fresh.find_student(1001)['exam_mark'], 40)
+
+    def test_upstream_line_without_generation_bump_beats_local_edit(self):
+        core = RecordingCore(self.data_file)
+        self.edit(core, 1002, 99)
+        self.edit(core, 1002, 98)
+        core.compact_journal()
+
+        # A version field copied from an older line, but no generation bump
+        self.replace_line(1002, "1002,Upstream Name,1,2,3,40,1")
+        self.assertEqual(core.reload_changes(), (0, 1, 0))
+        self.assertEqual(core.find_student(1002)['exam_mark'], 40)
+
+    def test_stale_write_merges_other_instances_changes(self):
+        first = RecordingCore(self.data_file)
+        second = RecordingCore(self.data_file)
+        self.edit(first, 1000, 11)
+        self.edit(second, 1001, 22)
+
+        self.assertEqual(second.find_student(1000)['exam_mark'], 11)
+        self.assertEqual(second.warnings, [])
+        self.assertEqual(self.exam_marks(1000, 1001), [11, 22])
+
+    def test_conflicting_write_keeps_other_instances_change(self):
+        first = RecordingCore(self.data_file)
+        second = RecordingCore(self.data_file)
+        self.edit(first, 1003, 33)
+        self.edit(second, 1003, 44)
+
+        self.assertEqual(second.find_student(1003)['exam_mark'], 33)
+        self.assertEqual(len(second.warnings), 1)
+        self.assertIn("1003", second.warnings[0])
+        self.assertEqual(self.exam_marks(1003), [33])
+
+    def test_stale_background_writes_are_merged(self):
+        first = RecordingCore(self.data_file)
+        second = RecordingCore(self.data_file)
+        first.writer = sm.BackgroundWriter()
+        self.edit(second, 1005, 1)
+        self.edit(first, 1000, 7)
+        self.edit(first, 1001, 7)
+        first.writer.flush()
+
+        stale = []
+        while not first.writer.results.empty():
+            stale += first.writer.results.get()[2]
+        first.writer.stop()
+        first.writer = None
+        self.assertTrue(stale)
+
+        self.assertEqual(first.resolve_stale_writes(stale), (1, []))
+        self.assertEqual(self.exam_marks(1000, 1001, 1005), [7, 7, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""Tests for filter expressions over dict records and the column store"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import student_core as sm
+
+
+# Each expression with the plain Python it should mean
+EXPRESSIONS = [
+    ("exam > 80", lambda s: s['exam_mark'] > 80),
+    ("exam = 50", lambda s: s['exam_mark'] == 50),
+    ("exam > 50 or exam < 10 and grade == 'A'",
+     lambda s: s['exam_mark'] > 50 or (s['exam_mark'] < 10 and s['grade'] == 'A')),
+    ("(exam > 50 or exam < 10) and grade == 'A'",
+     lambda s: (s['exam_mark'] > 50 or s['exam_mark'] < 10) and s['grade'] == 'A'),
+    ("coursework + exam * 2 > 150", lambda s: s['total_coursework'] + s['exam_mark'] * 2 > 150),
+    ("(coursework + exam) * 2 > 150", lambda s: (s['total_coursework'] + s['exam_mark']) * 2 > 150),
+    ("exam - coursework - 10 > 0", lambda s: s['exam_mark'] - s['total_coursework'] - 10 > 0),
+    ("not exam > 50", lambda s: not s['exam_mark'] > 50),
+    ("not not grade == 'B'", lambda s: s['grade'] == 'B'),
+    ("not (exam > 50 and grade != 'F')", lambda s: not (s['exam_mark'] > 50 and s['grade'] != 'F')),
+    ("-exam < -90", lambda s: -s['exam_mark'] < -90),
+    ("- - exam >= 95", lambda s: s['exam_mark'] >= 95),
+    ("-course_marks[0] * 2 > -10", lambda s: -s['course_marks'][0] * 2 > -10),
+    ("course_marks[0] > course_marks[2]", lambda s: s['course_marks'][0] > s['course_marks'][2]),
+    ("course_marks[1] + course_marks[2] == 20", lambda s: s['course_marks'][1] + s['course_marks'][2] == 20),
+    ("percentage * 2 - exam > 40.5", lambda s: s['overall_percentage'] * 2 - s['exam_mark'] > 40.5),
+    ("name contains 'AN'", lambda s: 'an' in s['name'].lower()),
+    ("name startswith 'j'", lambda s: s['name'].lower().startswith('j')),
+    ("'Jo Smith' contains name", lambda s: s['name'].lower() in 'jo smith'),
+    ("not name contains 'a' and code < 1100", lambda s: 'a' not in s['name'].lower() and s['code'] < 1100),
+    ("grade >= 'C'", lambda s: s['grade'] >= 'C'),
+    ("1 < 2", lambda s: True),
+    ("exam > 1 and 2 > 3", lambda s: False),
+]
+
+
+class QueryAgreementTest(unittest.TestCase):
+    """The generated lambda and the column mask must select the same students"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        data_file = os.path.join(cls.directory, 'marks.txt')
+        sm.generate_marks_file(data_file, 500, seed=7)
+        cls.records = sm.StudentCore(data_file, journal_mode=False)
+        cls.columns = sm.StudentCore(data_file, column_store=True, journal_mode=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_lambda_and_mask_agree(self):
+        for text, meaning in EXPRESSIONS:
+            with self.subTest(text):
+                query = sm.StudentQuery(text)
+                expected = [s['code'] for s in self.records.students if meaning(s)]
+                self.assertEqual([s['code'] for s in query.select(self.records.students)], expected)
+                self.assertEqual([s['code'] for s in query.select(self.columns.students)], expected)
+
+    def test_mask_follows_sorted_and_edited_columns(self):
+        data_file = os.path.join(self.directory, 'marks.txt')
+        records = sm.StudentCore(data_file, journal_mode=False)
+        columns = sm.StudentCore(data_file, column_store=True, journal_mode=False)
+        for core in (records, columns):
+            core.remove_student(core.find_student(1003))
+            core.apply_sort(['percentage'], reverse=True)
+
+        query = sm.StudentQuery("exam > 40 and name contains 'e'")
+        self.assertEqual([s['code'] for s in query.select(columns.students)],
+                         [s['code'] for s in query.select(records.students)])
+
+    def test_some_expressions_match_some_students(self):
+        # Guard against both paths agreeing only because nothing matches
+        counts = [len(sm.StudentQuery(text).select(self.records.students)) for text, _ in EXPRESSIONS]
+        self.assertGreater(sum(1 for count in counts if 0 < count < 500), 15, counts)
+
+
+class QueryErrorTest(unittest.TestCase):
+
+    def assertQueryError(self, text, message):
+        with self.assertRaises(sm.QueryError) as raised:
+            sm.StudentQuery(text)
+        self.assertEqual(str(raised.exception), message)
+
+    def test_error_messages(self):
+        cases = [
+            ("", "empty query"),
+            ("   ", "empty query"),
+            ("exam >", "expected a field, number or quoted text, found end of query at position 7"),
+            ("exam + 1", "the query must be a condition, such as exam > 80"),
+            ("foo > 1", "unknown field 'foo', expected one of: code, name, course_marks, "
+                        "exam_mark, total_coursework, overall_percentage, grade"),
+            ("name > 3", "'>' needs text, not a number"),
+            ("name contains 3", "'contains' needs text, not a number"),
+            ("not exam", "'not' needs a condition, not a number"),
+            ("-name == 'x'", "'-' needs a number, not text"),
+            ("course_marks > 1", "course_marks needs an index such as course_marks[0], found '>' at position 14"),
+            ("course_marks[3] > 1", "expected a course_marks index of 0, 1 or 2, found '3' at position 14"),
+            ("(exam > 1", "expected ')', found end of query at position 10"),
+            ("exam > 1 exam", "expected 'and', 'or' or the end of the query, found 'exam' at position 10"),
+            ("exam > 1 $", "unexpected '$' at position 10"),
+        ]
+        for text, message in cases:
+            with self.subTest(text):
+                self.assertQueryError(text, message)
+
+    def test_query_error_is_a_value_error(self):
+        self.assertRaises(ValueError, sm.StudentQuery, "exam >")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Tests for the snapshot history of marks files"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import student_core as sm
+
+
+class SnapshotStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.directory, 'marks.txt')
+        sm.generate_marks_file(self.data_file, 200, seed=2)
+        self.students = {student['code']: student for student in sm.iter_cohort(self.data_file)}
+        self.history = sm.SnapshotStore(self.data_file)
+        self.first = self.history.record(self.students.values())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def changed(self, code, exam):
+        student = dict(self.students[code], exam_mark=exam)
+        sm.calculate_student_stats(student)
+        return student
+
+    def lines(self, snapshot_id, history=None):
+        """Return a snapshot's records as sorted lines, ignoring save versions"""
+        history = history or self.history
+        return sorted(sm.format_student_line(dict(student, version=0))
+                      for student in history.iter_students(snapshot_id))
+
+    def test_unchanged_students_make_no_snapshot(self):
+        self.assertIsNone(self.history.record(self.students.values()))
+        self.assertIsNone(self.history.record_changes({1000: self.students[1000]}))
+        self.assertEqual(self.history.ids(), [self.first])
+
+    def test_diff_reports_added_changed_and_removed(self):
+        new = dict(self.students[1001], code=5000)
+        updated = self.changed(1002, 3)
+        second = self.history.record_changes({5000: new, 1002: updated, 1003: None})
+
+        added, changed, removed = self.history.diff(self.first, second)
+        self.assertEqual([s['code'] for s in added], [5000])
+        self.assertEqual([(old['exam_mark'], s['exam_mark']) for old, s in changed],
+                         [(self.students[1002]['exam_mark'], 3)])
+        self.assertEqual([s['code'] for s in removed], [1003])
+        self.assertEqual(self.history.manifest(second)['count'], 200)
+
+        added, changed, removed = self.history.diff(second, self.first)
+        self.assertEqual(([s['code'] for s in added], [s['code'] for s in removed]), ([1003], [5000]))
+
+    def test_edit_writes_only_the_changed_bucket(self):
+        second = self.history.record_changes({1004: self.changed(1004, 1)})
+        manifest = self.history.manifest(second)
+        self.assertEqual(manifest['parent'], self.first)
+        self.assertEqual(list(manifest['chunks']), [str(1004 % sm.HISTORY_BUCKETS)])
+
+        third = self.history.record_changes({1004: None})
+        self.assertEqual(self.history.manifest(third)['chunks'], {str(1004 % sm.HISTORY_BUCKETS): None})
+
+    def test_snapshots_resolve_through_their_parents(self):
+        expected = {self.first: self.lines(self.first)}
+        for number in range(sm.HISTORY_FULL_INTERVAL + 5):
+            code = 1000 + number % 200
+            snapshot_id = self.history.record_changes({code: self.changed(code, number % 101)})
+            if snapshot_id:
+                self.students[code] = self.changed(code, number % 101)
+                expected[snapshot_id] = sorted(map(sm.format_student_line, self.students.values()))
+
+        ids = self.history.ids()
+        self.assertIsNone(self.history.manifest(ids[sm.HISTORY_FULL_INTERVAL])['parent'])
+
+        # A fresh store has no resolved chunks cached
+        fresh = sm.SnapshotStore(self.data_file)
+        for snapshot_id in reversed(ids):
+            self.assertEqual(self.lines(snapshot_id, fresh), expected[snapshot_id])
+
+    def test_restore_rolls_back_and_can_be_undone(self):
+        core = sm.StudentCore(self.data_file)
+        student = core.find_student(1005)
+        old_exam = student['exam_mark']
+        student['exam_mark'] = 0 if old_exam else 1
+        core.calculate_student_stats(student)
+        core.student_changed(student)
+        core.save_change('update', student)
+        removed = core.find_student(1006)
+        core.remove_student(removed)
+        core.save_change('delete', removed)
+        edited = core.history().latest()
+
+        added, changed, removed = core.restore_snapshot(self.first)
+        self.assertEqual(([s['code'] for s in added], [s['code'] for _, s in changed], removed),
+                         ([1006], [1005], []))
+        self.assertEqual(core.find_student(1005)['exam_mark'], old_exam)
+        self.assertIsNotNone(core.find_student(1006))
+        self.assertEqual(self.lines(core.history().latest()), self.lines(self.first))
+
+        fresh = sm.StudentCore(self.data_file)
+        self.assertEqual(fresh.find_student(1005)['exam_mark'], old_exam)
+        self.assertEqual(len(fresh.students), 200)
+
+        # The edited version is still in the history
+        added, changed, removed = core.history().diff(self.first, edited)
+        self.assertEqual(([s['code'] for _, s in changed], [s['code'] for s in removed]), ([1005], [1006]))
+
+
+if __name__ == '__main__':
+    unittest.main()